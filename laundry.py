@@ -1,4 +1,23 @@
+import os
+import sys
+
+import matplotlib
+
+# Scripted/headless runs (piped stdin, CI, test sweeps) render straight to
+# PNG files; FUZZY_BATCH=1 forces this even on a terminal.
+BATCH_MODE = os.environ.get("FUZZY_BATCH") == "1" or not sys.stdout.isatty()
+if BATCH_MODE:
+    matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
+import numpy as np
+from functools import lru_cache
+from matplotlib.collections import LineCollection
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; scalars fall back to np.interp
+    njit = None
 
 # --- Membership Function Definitions ---
 MFS_DEFINITION = {
@@ -19,131 +38,175 @@ MFS_DEFINITION = {
     }
 }
 
-# --- Membership Function Calculation ---
-def get_membership(input_val, points):
-    if not points:
-        return 0.0
+def _mf_arrays(points):
+    # One pass over the point list, then two contiguous float64 columns so
+    # every later lookup streams C-layout memory.
+    pts = np.asarray(points, dtype=np.float64)
+    return np.ascontiguousarray(pts[:, 0]), np.ascontiguousarray(pts[:, 1])
+
 
-    if input_val <= points[0][0]:
-        return points[0][1]
-    if input_val >= points[-1][0]:
-        return points[-1][1]
+# Pre-extracted (xp, fp) arrays per MF so the interpolation below never has to
+# unpack the point lists at call time. MFS_DEFINITION itself is only kept as
+# the readable source of the shapes above.
+MFS_ARRAYS = {
+    var_name: {set_name: _mf_arrays(points) for set_name, points in sets.items()}
+    for var_name, sets in MFS_DEFINITION.items()
+}
 
-    for i in range(len(points) - 1):
-        x1, y1 = points[i]
-        x2, y2 = points[i + 1]
+# Each MF tabulated once onto a fixed 201-point grid per variable; plotting
+# and defuzzification read these cached curves instead of re-interpolating.
+MFS_GRID = {
+    var_name: np.linspace(min(xp[0] for xp, _ in sets.values()),
+                          max(xp[-1] for xp, _ in sets.values()), 201)
+    for var_name, sets in MFS_ARRAYS.items()
+}
+MFS_TABLE = {
+    var_name: {set_name: np.interp(MFS_GRID[var_name], xp, fp)
+               for set_name, (xp, fp) in sets.items()}
+    for var_name, sets in MFS_ARRAYS.items()
+}
 
-        if x1 <= input_val <= x2:
-            if input_val == x1: return y1
-            if input_val == x2: return y2
-            if y1 == y2: return y1
-            if x1 == x2: return y1 
+# Static x-extent of each variable's MFs, for axis limits and input markers.
+MFS_EXTENT = {var_name: (grid[0], grid[-1]) for var_name, grid in MFS_GRID.items()}
 
-            # Linear interpolation
-            slope = (y2 - y1) / (x2 - x1)
-            intercept = y1 - slope * x1
-            return slope * input_val + intercept
+# Defuzzification runs on every other grid point of the output variable,
+# i.e. 101 integer samples over 0-100.
+DEFUZZ_GRID = MFS_GRID["intensity"][::2]
 
-    return 0.0
+# --- Membership Function Calculation ---
+def get_membership(input_val, mf_arrays):
+    # input_val may be a scalar or a whole ndarray of sample points; np.interp
+    # handles both, and its edge clamping matches the flat MF endpoints.
+    xp, fp = mf_arrays
+    return np.interp(input_val, xp, fp)
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _membership_nb(x, xp, fp):
+        # Scalar lookup compiled to native code; used for the single
+        # user-input evaluation where np.interp's call overhead dominates.
+        # Clamp into range, bisect for the segment, then one guarded lerp --
+        # no per-segment equality branches for the predictor to miss.
+        xc = min(max(x, xp[0]), xp[-1])
+        lo = 0
+        hi = len(xp) - 1
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if xp[mid] <= xc:
+                lo = mid
+            else:
+                hi = mid
+        dx = xp[lo + 1] - xp[lo]
+        t = 0.0 if dx == 0.0 else (xc - xp[lo]) / dx
+        return fp[lo] + t * (fp[lo + 1] - fp[lo])
+else:
+    _membership_nb = None
 
 
 # --- Fuzzification ---
-def fuzzify(input_val, mfs):
+# Memoized: repeated test inputs hit the cache instead of re-interpolating.
+# MFS_ARRAYS never changes, so entries never need invalidating.
+@lru_cache(maxsize=256)
+def fuzzify(input_val, var_name):
+    x = float(input_val)
     memberships = {}
-    for set_name, points in mfs.items():
-        memberships[set_name] = get_membership(input_val, points)
+    for set_name, (xp, fp) in MFS_ARRAYS[var_name].items():
+        if _membership_nb is not None:
+            memberships[set_name] = _membership_nb(x, xp, fp)
+        else:
+            memberships[set_name] = float(get_membership(x, (xp, fp)))
     return memberships
 
 
 # --- Rule Evaluation ---
-def apply_rules(dirtiness_mfs, quantity_mfs):
-    intensity_activations = {"Light": 0.0, "Normal": 0.0, "Strong": 0.0}
-
-    # Rule 1: If D(Low) and Q(Light) => Light
-    rule1 = min(dirtiness_mfs.get("Low", 0.0), quantity_mfs.get("Light", 0.0))
-    intensity_activations["Light"] = max(intensity_activations["Light"], rule1)
+# Rule base encoded as index arrays: rule i is
+# min(D[RULES_D[i]], Q[RULES_Q[i]]) feeding consequent set RULES_OUT[i].
+DIRTINESS_NAMES = ("Low", "Medium", "High")
+QUANTITY_NAMES = ("Light", "Medium", "Heavy")
+INTENSITY_NAMES = ("Light", "Normal", "Strong")
+RULES_D = np.array([0, 0, 0, 1, 1, 1, 2, 2, 2])
+RULES_Q = np.array([0, 1, 2, 0, 1, 2, 0, 1, 2])
+RULES_OUT = np.array([0, 0, 2, 0, 1, 2, 0, 2, 2])
 
-    # Rule 2: If D(Low) and Q(Medium) => Light
-    rule2 = min(dirtiness_mfs.get("Low", 0.0), quantity_mfs.get("Medium", 0.0))
-    intensity_activations["Light"] = max(intensity_activations["Light"], rule2)
+# Each rule's consequent curve on the defuzz grid, gathered once at import.
+RULE_CURVES = np.stack([MFS_TABLE["intensity"][INTENSITY_NAMES[i]][::2]
+                        for i in RULES_OUT])
 
-    # Rule 3: If D(Low) and Q(Heavy) => Strong
-    rule3 = min(dirtiness_mfs.get("Low", 0.0), quantity_mfs.get("Heavy", 0.0))
-    intensity_activations["Strong"] = max(intensity_activations["Strong"], rule3)
 
-    # Rule 4: If D(Medium) and Q(Light) => Light
-    rule4 = min(dirtiness_mfs.get("Medium", 0.0), quantity_mfs.get("Light", 0.0))
-    intensity_activations["Light"] = max(intensity_activations["Light"], rule4)
+@lru_cache(maxsize=256)
+def _rule_strengths(d_vals, q_vals):
+    return np.minimum(np.array(d_vals)[RULES_D], np.array(q_vals)[RULES_Q])
 
-    # Rule 5: If D(Medium) and Q(Medium) => Normal
-    rule5 = min(dirtiness_mfs.get("Medium", 0.0), quantity_mfs.get("Medium", 0.0))
-    intensity_activations["Normal"] = max(intensity_activations["Normal"], rule5)
 
-    # Rule 6: If D(Medium) and Q(Heavy) => Strong
-    rule6 = min(dirtiness_mfs.get("Medium", 0.0), quantity_mfs.get("Heavy", 0.0))
-    intensity_activations["Strong"] = max(intensity_activations["Strong"], rule6)
+def _reduce_activations(strengths):
+    activations = np.zeros(len(INTENSITY_NAMES))
+    np.maximum.at(activations, RULES_OUT, strengths)
+    return dict(zip(INTENSITY_NAMES, activations))
 
-    # Rule 7: If D(High) and Q(Light) => Light
-    rule7 = min(dirtiness_mfs.get("High", 0.0), quantity_mfs.get("Light", 0.0))
-    intensity_activations["Light"] = max(intensity_activations["Light"], rule7)
 
-    # Rule 8: If D(High) and Q(Medium) => Strong
-    rule8 = min(dirtiness_mfs.get("High", 0.0), quantity_mfs.get("Medium", 0.0))
-    intensity_activations["Strong"] = max(intensity_activations["Strong"], rule8)
+def apply_rules(dirtiness_mfs, quantity_mfs):
+    d_vals = tuple(dirtiness_mfs.get(name, 0.0) for name in DIRTINESS_NAMES)
+    q_vals = tuple(quantity_mfs.get(name, 0.0) for name in QUANTITY_NAMES)
+    return _reduce_activations(_rule_strengths(d_vals, q_vals))
 
-    # Rule 9: If D(High) and Q(Heavy) => Strong
-    rule9 = min(dirtiness_mfs.get("High", 0.0), quantity_mfs.get("Heavy", 0.0))
-    intensity_activations["Strong"] = max(intensity_activations["Strong"], rule9)
 
-    return intensity_activations
+def inference(dirtiness_mfs, quantity_mfs):
+    # Fused rule evaluation + aggregation: clip every rule's consequent
+    # curve by its strength in one (rules, samples) operation and
+    # max-reduce, with no per-set dict traffic in between.
+    d_vals = tuple(dirtiness_mfs.get(name, 0.0) for name in DIRTINESS_NAMES)
+    q_vals = tuple(quantity_mfs.get(name, 0.0) for name in QUANTITY_NAMES)
+    strengths = _rule_strengths(d_vals, q_vals)
+    agg_y = np.minimum(strengths[:, None], RULE_CURVES).max(axis=0)
+    return _reduce_activations(strengths), agg_y
 
 
 # --- Output Aggregation ---
 def aggregate(x_intensity, activations, intensity_mfs):
-    agg_value = 0.0
+    x = np.asarray(x_intensity, dtype=np.float64)
+    agg_value = np.zeros_like(x)
     for set_name, act_strength in activations.items():
         if act_strength > 0:
-            original = get_membership(x_intensity, intensity_mfs[set_name])
-            clipped = min(act_strength, original)
-            agg_value = max(agg_value, clipped)
+            original = get_membership(x, intensity_mfs[set_name])
+            np.maximum(agg_value, np.minimum(act_strength, original), out=agg_value)
     return agg_value
 
 
 # --- Defuzzification (COG) ---
-def defuzzify(activations, intensity_mfs, num_samples=101):
-    min_x, max_x = 0, 100
-    x_samples = [min_x + i * (max_x - min_x) / (num_samples - 1) for i in range(num_samples)]
-
-    num_sum = 0.0
-    denom_sum = 0.0
-    agg_points = []
-
-    for x in x_samples:
-        y = aggregate(x, activations, intensity_mfs)
-        num_sum += x * y
-        denom_sum += y
-        agg_points.append((x, y))
-
-    if denom_sum == 0:
+def defuzzify(agg_y):
+    x = DEFUZZ_GRID
+    y = agg_y
+    agg_points = np.column_stack([x, y])
+
+    # Trapezoidal quadrature: one C-level pass each, and more accurate than
+    # the plain sample sums if the grid is ever refined.
+    denom = np.trapezoid(y, x)
+    if denom == 0:
         return 0.0, agg_points
 
-    return num_sum / denom_sum, agg_points
+    return float(np.trapezoid(x * y, x) / denom), agg_points
 
 
 # --- Plotting Functions ---
-def plot_mfs(ax, var_name, mfs_data, input_val=None, fuz_vals=None):
-    ax.set_title(f"Membership Functions for {var_name}")
-    ax.set_xlabel(var_name)
+def plot_mfs(ax, var_key, var_label, input_val=None, fuz_vals=None):
+    ax.set_title(f"Membership Functions for {var_label}")
+    ax.set_xlabel(var_label)
     ax.set_ylabel("Membership Degree")
     ax.grid(True, linestyle='--', alpha=0.7)
 
-    all_x = [p[0] for mf_d in mfs_data.values() for p in mf_d]
-    min_x, max_x = min(all_x), max(all_x)
-    x_range = [min_x + i * (max_x - min_x) / 200 for i in range(201)]
+    min_x, max_x = MFS_EXTENT[var_key]
+    x_range = MFS_GRID[var_key]
 
-    for mf_name, pts in mfs_data.items():
-        y_vals = [get_membership(x, pts) for x in x_range]
-        ax.plot(x_range, y_vals, label=mf_name, linewidth=2)
+    # One LineCollection draws every MF curve in a single artist; the empty
+    # plot calls only supply matching legend entries.
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    table = MFS_TABLE[var_key]
+    segments = [np.column_stack([x_range, y_vals]) for y_vals in table.values()]
+    seg_colors = [colors[i % len(colors)] for i in range(len(segments))]
+    ax.add_collection(LineCollection(segments, colors=seg_colors, linewidths=2))
+    for mf_name, color in zip(table, seg_colors):
+        ax.plot([], [], color=color, linewidth=2, label=mf_name)
 
     if input_val is not None and fuz_vals is not None:
         ax.vlines(input_val, 0, 1, colors='r', linestyles='dashed', label=f"Input = {input_val:.2f}", linewidth=2)
@@ -157,33 +220,45 @@ def plot_mfs(ax, var_name, mfs_data, input_val=None, fuz_vals=None):
     ax.set_xlim(min_x, max_x)
 
 
-def plot_agg(ax, agg_pts, cog, activations, intensity_mfs):
+def plot_agg(ax, agg_pts, cog, activations):
     ax.set_title("Aggregated Output and Defuzzification")
     ax.set_xlabel("Wash Intensity")
     ax.set_ylabel("Membership Degree")
     ax.grid(True, linestyle='--', alpha=0.7)
 
-    x_range_int = [i * 0.5 for i in range(201)]
-
-    # Plot original membership functions
-    for mf_name, pts in intensity_mfs.items():
-        y_vals = [get_membership(x, pts) for x in x_range_int]
-        ax.plot(x_range_int, y_vals, label=f"{mf_name}", linestyle='dashed', alpha=0.7, linewidth=2)
-
-    # Plot clipped membership functions
-    for mf_name, act_strength in activations.items():
-        if act_strength > 0:
-            clipped = [min(act_strength, get_membership(x, intensity_mfs[mf_name])) for x in x_range_int]
-            ax.plot(x_range_int, clipped, linestyle='--', label=f"Clipped '{mf_name}'", alpha=0.8, linewidth=2)
-
-    # Plot aggregated output
-    x_agg = [p[0] for p in agg_pts]
-    y_agg = [p[1] for p in agg_pts]
+    x_range_int = MFS_GRID["intensity"]
+
+    # Plot original membership functions as one dashed LineCollection
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    table = MFS_TABLE["intensity"]
+    segments = [np.column_stack([x_range_int, y_vals]) for y_vals in table.values()]
+    seg_colors = [colors[i % len(colors)] for i in range(len(segments))]
+    ax.add_collection(LineCollection(segments, colors=seg_colors, linewidths=2,
+                                     linestyles='dashed', alpha=0.7))
+    for mf_name, color in zip(table, seg_colors):
+        ax.plot([], [], color=color, linewidth=2, linestyle='dashed', alpha=0.7, label=f"{mf_name}")
+
+    # Plot clipped membership functions the same way
+    active = [(mf_name, act) for mf_name, act in activations.items() if act > 0]
+    clip_segments = [np.column_stack([x_range_int, np.minimum(act, table[mf_name])])
+                     for mf_name, act in active]
+    clip_colors = [colors[(len(segments) + i) % len(colors)] for i in range(len(active))]
+    if clip_segments:
+        ax.add_collection(LineCollection(clip_segments, colors=clip_colors, linewidths=2,
+                                         linestyles='--', alpha=0.8))
+    for (mf_name, _), color in zip(active, clip_colors):
+        ax.plot([], [], color=color, linewidth=2, linestyle='--', alpha=0.8, label=f"Clipped '{mf_name}'")
+
+    # Plot aggregated output; defuzzify emits samples in increasing x by
+    # construction, so no re-sorting is needed here.
+    x_agg = agg_pts[:, 0]
+    y_agg = agg_pts[:, 1]
+    assert np.all(np.diff(x_agg) >= 0), "aggregated curve must be sorted by x"
     ax.plot(x_agg, y_agg, color='purple', linewidth=3, label="Aggregated Output Set")
     ax.fill_between(x_agg, y_agg, color='purple', alpha=0.3)
 
     # Plot center of gravity
-    ax.vlines(cog, 0, max(y_agg + [1.0]), colors='r', linestyles='solid', linewidth=3, label=f"COG = {cog:.2f}")
+    ax.vlines(cog, 0, max(y_agg.max(), 1.0), colors='r', linestyles='solid', linewidth=3, label=f"COG = {cog:.2f}")
     ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
     ax.set_ylim(-0.05, 1.05)
     ax.set_xlim(0, 100)
@@ -197,7 +272,16 @@ if __name__ == "__main__":
     print("- Laundry Quantity (0-12 kg)")
     print("Output: Wash Intensity (0-100 scale)")
     print()
-    
+
+    # Create the figure once; each iteration clears and redraws the same
+    # axes instead of rebuilding the canvas and event handlers per run.
+    if not BATCH_MODE:
+        plt.ion()
+    run_count = 0
+    fig, axs = plt.subplots(3, 1, figsize=(14, 20))
+    fig.subplots_adjust(hspace=0.4, right=0.75)
+    fig.suptitle("Washing Machine Fuzzy Logic Control System", fontsize=16, y=0.97)
+
     while True:
         # --- Input Section ---
         while True:
@@ -223,8 +307,8 @@ if __name__ == "__main__":
         print(f"\n=== PROCESSING: Dirtiness={dirtiness}, Quantity={quantity}kg ===")
 
         # --- Fuzzification ---
-        dirtiness_mfs = fuzzify(dirtiness, MFS_DEFINITION["dirtiness"])
-        quantity_mfs = fuzzify(quantity, MFS_DEFINITION["quantity"])
+        dirtiness_mfs = fuzzify(dirtiness, "dirtiness")
+        quantity_mfs = fuzzify(quantity, "quantity")
 
         print("\n--- Dirtiness Level Fuzzification ---")
         for k, v in dirtiness_mfs.items():
@@ -234,14 +318,14 @@ if __name__ == "__main__":
         for k, v in quantity_mfs.items():
             print(f"{k}: {v:.4f}")
 
-        # --- Rule Evaluation ---
-        intensity_acts = apply_rules(dirtiness_mfs, quantity_mfs)
+        # --- Rule Evaluation (fused with output aggregation) ---
+        intensity_acts, agg_y = inference(dirtiness_mfs, quantity_mfs)
         print("\n--- Rule-Based Intensity Activations ---")
         for k, v in intensity_acts.items():
             print(f"{k}: {v:.4f}")
 
         # --- Defuzzification ---
-        intensity_cog, agg_curve = defuzzify(intensity_acts, MFS_DEFINITION["intensity"])
+        intensity_cog, agg_curve = defuzzify(agg_y)
         print(f"\nDefuzzified Wash Intensity Output (COG): {intensity_cog:.3f}")
 
         # --- Interpret Result ---
@@ -260,13 +344,13 @@ if __name__ == "__main__":
         print("="*50)
         print("|   X   |   Y   |   X * Y     |")
         print("-"*35)
-        sum_y, sum_xy = 0.0, 0.0
-        for x in range(0, 101, 5):
-            y = aggregate(x, intensity_acts, MFS_DEFINITION["intensity"])
-            xy = x * y
-            sum_y += y
-            sum_xy += xy
-            print(f"{x:6} {y:7.4f} {xy:12.4f}")
+        # Every 5th defuzzification sample lands exactly on a table row, so
+        # reuse the curve defuzzify already computed.
+        table_rows = agg_curve[::5]
+        xt, yt = table_rows[:, 0], table_rows[:, 1]
+        xyt = xt * yt
+        sum_y, sum_xy = yt.sum(), xyt.sum()
+        print("\n".join(f"{x:6.0f} {y:7.4f} {xy:12.4f}" for x, y, xy in zip(xt, yt, xyt)))
         print("-"*35)
         print(f"Sum Y: {sum_y:.4f}, Sum XY: {sum_xy:.4f}")
         if sum_y > 0:
@@ -275,15 +359,20 @@ if __name__ == "__main__":
             print("COG = 0 (no activation)")
 
         # --- Plotting ---
-        fig, axs = plt.subplots(3, 1, figsize=(14, 20))
-        plt.subplots_adjust(hspace=0.4, right=0.75)
-        
-        plot_mfs(axs[0], "Dirtiness Level", MFS_DEFINITION["dirtiness"], dirtiness, dirtiness_mfs)
-        plot_mfs(axs[1], "Laundry Quantity (kg)", MFS_DEFINITION["quantity"], quantity, quantity_mfs)
-        plot_agg(axs[2], agg_curve, intensity_cog, intensity_acts, MFS_DEFINITION["intensity"])
-        
-        plt.suptitle("Washing Machine Fuzzy Logic Control System", fontsize=16, y=0.97)
-        plt.show()
+        for ax in axs:
+            ax.clear()
+
+        plot_mfs(axs[0], "dirtiness", "Dirtiness Level", dirtiness, dirtiness_mfs)
+        plot_mfs(axs[1], "quantity", "Laundry Quantity (kg)", quantity, quantity_mfs)
+        plot_agg(axs[2], agg_curve, intensity_cog, intensity_acts)
+
+        run_count += 1
+        if BATCH_MODE:
+            fig.savefig(f"run_{run_count}.png", dpi=100, bbox_inches='tight')
+            print(f"Saved plot to run_{run_count}.png")
+        else:
+            fig.canvas.draw_idle()
+            fig.canvas.flush_events()
 
         # --- Ask User to Run Again ---
         repeat = input("\nWould you like to enter new laundry parameters? (y/n): ").strip().lower()
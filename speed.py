@@ -1,4 +1,23 @@
+import os
+import sys
+
+import matplotlib
+
+# Scripted/headless runs (piped stdin, CI, test sweeps) render straight to
+# PNG files; FUZZY_BATCH=1 forces this even on a terminal.
+BATCH_MODE = os.environ.get("FUZZY_BATCH") == "1" or not sys.stdout.isatty()
+if BATCH_MODE:
+    matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
+import numpy as np
+from functools import lru_cache
+from matplotlib.collections import LineCollection
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; scalars fall back to np.interp
+    njit = None
 
 # --- Membership Function Definitions ---
 MFS_DEFINITION = {
@@ -19,101 +38,394 @@ MFS_DEFINITION = {
     }
 }
 
-# --- Membership Function Calculation ---
-def get_membership(input, points):
-    if not points:
-        return 0.0
+def _mf_arrays(points):
+    # One pass over the point list, then two contiguous float64 columns so
+    # every later lookup streams C-layout memory.
+    pts = np.asarray(points, dtype=np.float64)
+    return np.ascontiguousarray(pts[:, 0]), np.ascontiguousarray(pts[:, 1])
+
+
+# Pre-extracted (xp, fp) arrays per MF so the interpolation below never has to
+# unpack the point lists at call time. MFS_DEFINITION itself is only kept as
+# the readable source of the shapes above.
+MFS_ARRAYS = {
+    var_name: {set_name: _mf_arrays(points) for set_name, points in sets.items()}
+    for var_name, sets in MFS_DEFINITION.items()
+}
+
 
-    if input <= points[0][0]:
-        return points[0][1]
-    if input >= points[-1][0]:
-        return points[-1][1]
+def _mf_slopes(xp, fp):
+    # Per-segment dy/dx with zero-width segments mapped to slope 0, so the
+    # scalar kernel needs neither a divide nor a dx == 0 guard at eval time.
+    dx = np.diff(xp)
+    return np.where(dx > 0, np.diff(fp) / np.where(dx > 0, dx, 1.0), 0.0)
 
-    for i in range(len(points) - 1):
-        x1, y1 = points[i]
-        x2, y2 = points[i + 1]
 
-        if x1 <= input <= x2:
-            if input == x1: return y1
-            if input == x2: return y2
-            if y1 == y2: return y1
-            if x1 == x2: return y1 
+MFS_SLOPES = {
+    var_name: {set_name: _mf_slopes(xp, fp) for set_name, (xp, fp) in sets.items()}
+    for var_name, sets in MFS_ARRAYS.items()
+}
+
+
+def _pack_soa(mf_list):
+    # Pack several MFs into contiguous 2-D (n, width) blocks, padding each
+    # row to the widest knot count by repeating the last knot. Duplicate
+    # trailing knots are harmless: the scalar kernel clamps into range and a
+    # padded segment has slope 0 and the final membership value.
+    width = max(xp.shape[0] for xp, _ in mf_list)
+    n = len(mf_list)
+    xs = np.empty((n, width))
+    ys = np.empty((n, width))
+    sl = np.zeros((n, width - 1))
+    for i, (xp, fp) in enumerate(mf_list):
+        k = xp.shape[0]
+        xs[i, :k] = xp
+        xs[i, k:] = xp[-1]
+        ys[i, :k] = fp
+        ys[i, k:] = fp[-1]
+        sl[i, :k - 1] = _mf_slopes(xp, fp)
+    return xs, ys, sl
+
+
+def _compile_mf(var_name, set_name, xp, fp, slopes):
+    # Specialize a scalar membership function by generating source with the
+    # knots and slopes folded in as literals, so evaluation is a short chain
+    # of constant comparisons with no array indexing and no division. Flat
+    # segments collapse to constant returns.
+    lines = [f"def _mf(x):", f"    if x <= {float(xp[0])!r}: return {float(fp[0])!r}"]
+    for i in range(len(xp) - 1):
+        if slopes[i] == 0.0:
+            expr = repr(float(fp[i]))
+        else:
+            expr = f"{float(fp[i])!r} + (x - {float(xp[i])!r}) * {float(slopes[i])!r}"
+        lines.append(f"    if x <= {float(xp[i + 1])!r}: return {expr}")
+    lines.append(f"    return {float(fp[-1])!r}")
+    ns = {}
+    exec(compile("\n".join(lines), f"<mf {var_name}.{set_name}>", "exec"), ns)
+    return ns["_mf"]
+
+
+# Constant-folded scalar membership functions; the fuzzifier's fallback path
+# (no numba) calls these instead of the generic interpolator.
+MFS_COMPILED = {
+    var_name: {set_name: _compile_mf(var_name, set_name, xp, fp,
+                                     MFS_SLOPES[var_name][set_name])
+               for set_name, (xp, fp) in sets.items()}
+    for var_name, sets in MFS_ARRAYS.items()
+}
+
 
-            # Linear interpolation
-            slope = (y2 - y1) / (x2 - x1)
-            intercept = y1 - slope * x1
-            return slope * input + intercept
+# The four antecedent MFs the rule base reads, in one cache-friendly block.
+# Row order: Warm, Cool, Sunny, Partly.
+ANT_XP, ANT_FP, ANT_SLOPES = _pack_soa([
+    MFS_ARRAYS["temperature"]["Warm"], MFS_ARRAYS["temperature"]["Cool"],
+    MFS_ARRAYS["cover"]["Sunny"], MFS_ARRAYS["cover"]["Partly"]])
 
-    return 0.0
+# Each MF tabulated once onto a fixed 201-point grid per variable; plotting
+# and defuzzification read these cached curves instead of re-interpolating.
+MFS_GRID = {
+    var_name: np.linspace(min(xp[0] for xp, _ in sets.values()),
+                          max(xp[-1] for xp, _ in sets.values()), 201)
+    for var_name, sets in MFS_ARRAYS.items()
+}
+MFS_TABLE = {
+    var_name: {set_name: np.interp(MFS_GRID[var_name], xp, fp)
+               for set_name, (xp, fp) in sets.items()}
+    for var_name, sets in MFS_ARRAYS.items()
+}
+
+# Static x-extent of each variable's MFs, for axis limits and input markers.
+MFS_EXTENT = {var_name: (grid[0], grid[-1]) for var_name, grid in MFS_GRID.items()}
+
+# Defuzzification runs on every other grid point of the output variable,
+# i.e. 101 integer samples over 0-100.
+DEFUZZ_GRID = MFS_GRID["speed"][::2]
+
+# --- Membership Function Calculation ---
+def get_membership(input, mf_arrays):
+    # input may be a scalar or a whole ndarray of sample points; np.interp
+    # handles both, and its edge clamping matches the flat MF endpoints.
+    xp, fp = mf_arrays
+    return np.interp(input, xp, fp)
+
+
+if njit is not None:
+    # Explicit signatures compile the kernels eagerly at import instead of
+    # lazily on first call, and cache=True persists the machine code on disk,
+    # so short interactive runs never pay the JIT cost mid-session. (numba
+    # dropped its pycc AOT compiler; eager + cached JIT is the supported
+    # equivalent.)
+    @njit('f8(f8, f8[:], f8[:], f8[:])', cache=True, fastmath=True)
+    def _membership_nb(x, xp, fp, slopes):
+        # Scalar lookup compiled to native code; used for the single
+        # user-input evaluation where np.interp's call overhead dominates.
+        # Clamp into range, bisect for the segment, then one fused
+        # multiply-add using the precomputed segment slope.
+        xc = min(max(x, xp[0]), xp[-1])
+        lo = 0
+        hi = len(xp) - 1
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if xp[mid] <= xc:
+                lo = mid
+            else:
+                hi = mid
+        return fp[lo] + (xc - xp[lo]) * slopes[lo]
+
+    @njit('UniTuple(f8, 2)(f8, f8, f8[:, :], f8[:, :], f8[:, :])',
+          cache=True, fastmath=True)
+    def _strengths_nb(temp, cover, ant_xp, ant_fp, ant_sl):
+        # All four antecedent memberships plus the rule mins in one compiled
+        # call, streaming the packed antecedent block (rows: Warm, Cool,
+        # Sunny, Partly) in rule order: (Fast rule, Slow rule).
+        fast_s = min(_membership_nb(temp, ant_xp[0], ant_fp[0], ant_sl[0]),
+                     _membership_nb(cover, ant_xp[2], ant_fp[2], ant_sl[2]))
+        slow_s = min(_membership_nb(temp, ant_xp[1], ant_fp[1], ant_sl[1]),
+                     _membership_nb(cover, ant_xp[3], ant_fp[3], ant_sl[3]))
+        return fast_s, slow_s
+
+else:
+    _membership_nb = None
+    _strengths_nb = None
 
 
 # --- Fuzzification ---
-def fuzzify(input, mfs):
+# Memoized: repeated test inputs hit the cache instead of re-interpolating.
+# MFS_ARRAYS never changes, so entries never need invalidating.
+@lru_cache(maxsize=256)
+def fuzzify(input, var_name):
+    x = float(input)
+    slopes = MFS_SLOPES[var_name]
+    compiled = MFS_COMPILED[var_name]
     memberships = {}
-    for set_name, points in mfs.items():
-        memberships[set_name] = get_membership(input, points)
+    for set_name, (xp, fp) in MFS_ARRAYS[var_name].items():
+        if _membership_nb is not None:
+            memberships[set_name] = _membership_nb(x, xp, fp, slopes[set_name])
+        else:
+            memberships[set_name] = compiled[set_name](x)
     return memberships
 
 
+def fuzzify_batch(values, var_name):
+    # Array-in, array-out fuzzification: one np.interp sweep per set over the
+    # whole input batch, amortizing the Python dispatch across N inputs.
+    x = np.asarray(values, dtype=np.float64)
+    return {set_name: np.interp(x, xp, fp)
+            for set_name, (xp, fp) in MFS_ARRAYS[var_name].items()}
+
+
 # --- Rule Evaluation ---
-def apply_rules(temp_mfs, cover_mfs):
-    speed_activations = {"Slow": 0.0, "Fast": 0.0}
+# Rule base encoded as index arrays: rule i is
+# min(T[RULES_T[i]], C[RULES_C[i]]) feeding consequent set RULES_OUT[i].
+TEMPERATURE_NAMES = ("Freezing", "Cool", "Warm", "Hot")
+COVER_NAMES = ("Sunny", "Partly", "Overcast")
+SPEED_NAMES = ("Slow", "Fast")
+RULES_T = np.array([2, 1])   # Warm and Sunny => Fast
+RULES_C = np.array([0, 1])   # Cool and Partly => Slow
+RULES_OUT = np.array([1, 0])
+
+# Each rule's consequent curve on the defuzz grid, gathered once at import.
+RULE_CURVES = np.stack([MFS_TABLE["speed"][SPEED_NAMES[i]][::2]
+                        for i in RULES_OUT])
 
-    rule1 = min(temp_mfs.get("Warm", 0.0), cover_mfs.get("Sunny", 0.0))
-    rule2 = min(temp_mfs.get("Cool", 0.0), cover_mfs.get("Partly", 0.0))
+# Reusable (rules, samples) workspace for the clip stage of inference, so the
+# steady-state loop allocates no large intermediates. Never handed to
+# callers; only the max-reduced aggregate leaves inference.
+_AGG_SCRATCH = np.empty_like(RULE_CURVES)
 
-    speed_activations["Fast"] = max(speed_activations["Fast"], rule1)
-    speed_activations["Slow"] = max(speed_activations["Slow"], rule2)
 
-    return speed_activations
+@lru_cache(maxsize=256)
+def _rule_strengths(t_vals, c_vals):
+    return np.minimum(np.array(t_vals)[RULES_T], np.array(c_vals)[RULES_C])
+
+
+def _reduce_activations(strengths):
+    activations = np.zeros(len(SPEED_NAMES))
+    np.maximum.at(activations, RULES_OUT, strengths)
+    return dict(zip(SPEED_NAMES, activations))
+
+
+def apply_rules(temp_mfs, cover_mfs):
+    # fuzzify builds its dict in MFS_ARRAYS insertion order, which is exactly
+    # TEMPERATURE_NAMES / COVER_NAMES order, so the memberships can be taken
+    # positionally instead of through keyed lookups.
+    return _reduce_activations(_rule_strengths(tuple(temp_mfs.values()),
+                                               tuple(cover_mfs.values())))
+
+
+def inference(temp_mfs, cover_mfs):
+    # Fused rule evaluation + aggregation: clip every rule's consequent
+    # curve by its strength in one (rules, samples) operation and
+    # max-reduce, with no per-set dict traffic in between.
+    t_vals = tuple(temp_mfs.values())
+    c_vals = tuple(cover_mfs.values())
+    strengths = _rule_strengths(t_vals, c_vals)
+    np.minimum(strengths[:, None], RULE_CURVES, out=_AGG_SCRATCH)
+    agg_y = _AGG_SCRATCH.max(axis=0)
+    return _reduce_activations(strengths), agg_y
+
+
+# Output MF knots used by the analytic defuzzifiers below.
+SLOW_XP, SLOW_FP = MFS_ARRAYS["speed"]["Slow"]
+FAST_XP, FAST_FP = MFS_ARRAYS["speed"]["Fast"]
+_SPEED_KNOTS = np.union1d(FAST_XP, SLOW_XP)
+
+
+def _level_crossings(xp, fp, level):
+    # x positions where the piecewise-linear curve crosses a horizontal clip
+    # level strictly inside a segment (crossings at knots are already
+    # breakpoints).
+    d0 = fp[:-1] - level
+    d1 = fp[1:] - level
+    idx = np.nonzero(d0 * d1 < 0)[0]
+    return xp[idx] + (xp[idx + 1] - xp[idx]) * d0[idx] / (d0[idx] - d1[idx])
+
+
+def _level_crossings_batch(xp, fp, levels):
+    # Batched _level_crossings: one candidate per MF segment per row.
+    # Non-crossing slots are padded with the first knot; the resulting
+    # zero-width segments contribute nothing to the moments downstream.
+    h = levels[..., None]
+    d0 = fp[:-1] - h
+    d1 = fp[1:] - h
+    mask = d0 * d1 < 0
+    denom = np.where(mask, d0 - d1, 1.0)
+    return np.where(mask, xp[:-1] + (xp[1:] - xp[:-1]) * d0 / denom, xp[0])
+
+
+def defuzzify_exact(fast_s, slow_s):
+    # Exact centroid of the union of the two clipped output MFs, with no
+    # sampling grid. Breakpoints are every x where either clipped curve can
+    # change slope (knots and clip-level crossings) plus the points where
+    # the curves swap dominance; between breakpoints the union is a single
+    # straight line, whose area and first moment have closed forms.
+    xs = np.unique(np.concatenate([
+        FAST_XP, SLOW_XP,
+        _level_crossings(FAST_XP, FAST_FP, fast_s),
+        _level_crossings(SLOW_XP, SLOW_FP, slow_s)]))
+    yf = np.minimum(fast_s, np.interp(xs, FAST_XP, FAST_FP))
+    ys = np.minimum(slow_s, np.interp(xs, SLOW_XP, SLOW_FP))
+    d = yf - ys
+    idx = np.nonzero(d[:-1] * d[1:] < 0)[0]
+    if idx.size:
+        cross = xs[idx] + (xs[idx + 1] - xs[idx]) * d[idx] / (d[idx] - d[idx + 1])
+        xs = np.sort(np.concatenate([xs, cross]))
+        yf = np.minimum(fast_s, np.interp(xs, FAST_XP, FAST_FP))
+        ys = np.minimum(slow_s, np.interp(xs, SLOW_XP, SLOW_FP))
+    y = np.maximum(yf, ys)
+
+    a, b = xs[:-1], xs[1:]
+    ya, yb = y[:-1], y[1:]
+    dx = b - a
+    # Area of each linear segment is the usual trapezoid; its first moment
+    # (integral of x*y) over [a, b] is dx/6 * (ya*(2a + b) + yb*(a + 2b)).
+    m0 = float(np.sum(dx * (ya + yb))) / 2.0
+    if m0 == 0.0:
+        return 0.0
+    m1 = float(np.sum(dx * (ya * (2 * a + b) + yb * (a + 2 * b)))) / 6.0
+    return m1 / m0
+
+
+def evaluate(temperature, cover):
+    # Scalar fast path from raw inputs to the crisp speed: fuzzification and
+    # rule strengths run in one compiled call when numba is present, and the
+    # centroid comes from the closed-form defuzzifier rather than a sampled
+    # grid.
+    if _strengths_nb is not None:
+        fast_s, slow_s = _strengths_nb(float(temperature), float(cover),
+                                       ANT_XP, ANT_FP, ANT_SLOPES)
+    else:
+        temp_mfs = fuzzify(temperature, "temperature")
+        cover_mfs = fuzzify(cover, "cover")
+        fast_s = min(temp_mfs["Warm"], cover_mfs["Sunny"])
+        slow_s = min(temp_mfs["Cool"], cover_mfs["Partly"])
+    return defuzzify_exact(fast_s, slow_s)
+
+
+def evaluate_batch(temperatures, covers):
+    # Whole-batch inference: one np.interp sweep per antecedent set, then the
+    # same closed-form centroid as evaluate(), vectorized across the batch.
+    # Breakpoint counts vary per row, so every candidate slot is always
+    # materialized and invalid ones are padded with the domain's left edge:
+    # duplicated breakpoints form zero-width segments with zero moments.
+    t_mfs = fuzzify_batch(temperatures, "temperature")
+    c_mfs = fuzzify_batch(covers, "cover")
+    fast_s = np.minimum(t_mfs["Warm"], c_mfs["Sunny"])
+    slow_s = np.minimum(t_mfs["Cool"], c_mfs["Partly"])
+
+    knots = np.broadcast_to(_SPEED_KNOTS, fast_s.shape + _SPEED_KNOTS.shape)
+    xs = np.sort(np.concatenate([
+        knots,
+        _level_crossings_batch(FAST_XP, FAST_FP, fast_s),
+        _level_crossings_batch(SLOW_XP, SLOW_FP, slow_s)], axis=-1), axis=-1)
+    yf = np.minimum(fast_s[..., None], np.interp(xs, FAST_XP, FAST_FP))
+    ys = np.minimum(slow_s[..., None], np.interp(xs, SLOW_XP, SLOW_FP))
+    d = yf - ys
+    mask = d[..., :-1] * d[..., 1:] < 0
+    denom = np.where(mask, d[..., :-1] - d[..., 1:], 1.0)
+    cross = np.where(
+        mask,
+        xs[..., :-1] + (xs[..., 1:] - xs[..., :-1]) * d[..., :-1] / denom,
+        _SPEED_KNOTS[0])
+    xs = np.sort(np.concatenate([xs, cross], axis=-1), axis=-1)
+    yf = np.minimum(fast_s[..., None], np.interp(xs, FAST_XP, FAST_FP))
+    ys = np.minimum(slow_s[..., None], np.interp(xs, SLOW_XP, SLOW_FP))
+    y = np.maximum(yf, ys)
+
+    a, b = xs[..., :-1], xs[..., 1:]
+    ya, yb = y[..., :-1], y[..., 1:]
+    dx = b - a
+    m0 = np.sum(dx * (ya + yb), axis=-1) / 2.0
+    m1 = np.sum(dx * (ya * (2 * a + b) + yb * (a + 2 * b)), axis=-1) / 6.0
+    safe = np.where(m0 == 0, 1.0, m0)
+    return np.where(m0 == 0, 0.0, m1 / safe)
 
 
 # --- Output Aggregation ---
 def aggregate(x_speed, activations, speed_mfs):
-    agg_value = 0.0
+    x = np.asarray(x_speed, dtype=np.float64)
+    agg_value = np.zeros_like(x)
     for set_name, act_strength in activations.items():
         if act_strength > 0:
-            original = get_membership(x_speed, speed_mfs[set_name])
-            clipped = min(act_strength, original)
-            agg_value = max(agg_value, clipped)
+            original = get_membership(x, speed_mfs[set_name])
+            np.maximum(agg_value, np.minimum(act_strength, original), out=agg_value)
     return agg_value
 
 
 # --- Defuzzification (COG) ---
-def defuzzify(activations, speed_mfs, num_samples=101):
-    min_x, max_x = 0, 100
-    x_samples = [min_x + i * (max_x - min_x) / (num_samples - 1) for i in range(num_samples)]
-
-    num_sum = 0.0
-    denom_sum = 0.0
-    agg_points = []
-
-    for x in x_samples:
-        y = aggregate(x, activations, speed_mfs)
-        num_sum += x * y
-        denom_sum += y
-        agg_points.append((x, y))
-
-    if denom_sum == 0:
+def defuzzify(agg_y):
+    x = DEFUZZ_GRID
+    y = agg_y
+    agg_points = np.column_stack([x, y])
+
+    # Trapezoidal quadrature: one C-level pass each, and more accurate than
+    # the plain sample sums if the grid is ever refined.
+    denom = np.trapezoid(y, x)
+    if denom == 0:
         return 0.0, agg_points
 
-    return num_sum / denom_sum, agg_points
+    return float(np.trapezoid(x * y, x) / denom), agg_points
 
 
 # --- Plotting Functions ---
-def plot_mfs(ax, var_name, mfs_data, input_val=None, fuz_vals=None):
-    ax.set_title(f"Membership Functions for {var_name}")
-    ax.set_xlabel(var_name)
+def plot_mfs(ax, var_key, var_label, input_val=None, fuz_vals=None):
+    ax.set_title(f"Membership Functions for {var_label}")
+    ax.set_xlabel(var_label)
     ax.set_ylabel("Membership Degree")
     ax.grid(True, linestyle='--', alpha=0.7)
 
-    all_x = [p[0] for mf_d in mfs_data.values() for p in mf_d]
-    min_x, max_x = min(all_x), max(all_x)
-    x_range = [min_x + i * (max_x - min_x) / 200 for i in range(201)]
+    min_x, max_x = MFS_EXTENT[var_key]
+    x_range = MFS_GRID[var_key]
 
-    for mf_name, pts in mfs_data.items():
-        y_vals = [get_membership(x, pts) for x in x_range]
-        ax.plot(x_range, y_vals, label=mf_name)
+    # One LineCollection draws every MF curve in a single artist; the empty
+    # plot calls only supply matching legend entries.
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    table = MFS_TABLE[var_key]
+    segments = [np.column_stack([x_range, y_vals]) for y_vals in table.values()]
+    seg_colors = [colors[i % len(colors)] for i in range(len(segments))]
+    ax.add_collection(LineCollection(segments, colors=seg_colors))
+    for mf_name, color in zip(table, seg_colors):
+        ax.plot([], [], color=color, label=mf_name)
 
     if input_val is not None and fuz_vals is not None:
         ax.vlines(input_val, 0, 1, colors='r', linestyles='dashed', label=f"Input = {input_val:.2f}")
@@ -127,29 +439,44 @@ def plot_mfs(ax, var_name, mfs_data, input_val=None, fuz_vals=None):
     ax.set_xlim(min_x, max_x)
 
 
-def plot_agg(ax, agg_pts, cog, activations, speed_mfs):
+def plot_agg(ax, agg_pts, cog, activations):
     ax.set_title("Aggregated Output and Defuzzification")
     ax.set_xlabel("Speed")
     ax.set_ylabel("Membership Degree")
     ax.grid(True, linestyle='--', alpha=0.7)
 
-    x_range_spd = [i * 0.5 for i in range(201)]
-
-    for mf_name, pts in speed_mfs.items():
-        y_vals = [get_membership(x, pts) for x in x_range_spd]
-        ax.plot(x_range_spd, y_vals, label=f"{mf_name}", linestyle='dashed', alpha=0.7)
-
-    for mf_name, act_strength in activations.items():
-        if act_strength > 0:
-            clipped = [min(act_strength, get_membership(x, speed_mfs[mf_name])) for x in x_range_spd]
-            ax.plot(x_range_spd, clipped, linestyle='--', label=f"Clipped '{mf_name}'", alpha=0.8)
-
-    x_agg = [p[0] for p in agg_pts]
-    y_agg = [p[1] for p in agg_pts]
+    x_range_spd = MFS_GRID["speed"]
+
+    # Original membership functions as one dashed LineCollection
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    table = MFS_TABLE["speed"]
+    segments = [np.column_stack([x_range_spd, y_vals]) for y_vals in table.values()]
+    seg_colors = [colors[i % len(colors)] for i in range(len(segments))]
+    ax.add_collection(LineCollection(segments, colors=seg_colors,
+                                     linestyles='dashed', alpha=0.7))
+    for mf_name, color in zip(table, seg_colors):
+        ax.plot([], [], color=color, linestyle='dashed', alpha=0.7, label=f"{mf_name}")
+
+    # Clipped membership functions the same way
+    active = [(mf_name, act) for mf_name, act in activations.items() if act > 0]
+    clip_segments = [np.column_stack([x_range_spd, np.minimum(act, table[mf_name])])
+                     for mf_name, act in active]
+    clip_colors = [colors[(len(segments) + i) % len(colors)] for i in range(len(active))]
+    if clip_segments:
+        ax.add_collection(LineCollection(clip_segments, colors=clip_colors,
+                                         linestyles='--', alpha=0.8))
+    for (mf_name, _), color in zip(active, clip_colors):
+        ax.plot([], [], color=color, linestyle='--', alpha=0.8, label=f"Clipped '{mf_name}'")
+
+    # defuzzify emits samples in increasing x by construction, so no
+    # re-sorting is needed here.
+    x_agg = agg_pts[:, 0]
+    y_agg = agg_pts[:, 1]
+    assert np.all(np.diff(x_agg) >= 0), "aggregated curve must be sorted by x"
     ax.plot(x_agg, y_agg, color='purple', linewidth=2, label="Aggregated Output Set")
     ax.fill_between(x_agg, y_agg, color='purple', alpha=0.3)
 
-    ax.vlines(cog, 0, max(y_agg + [1.0]), colors='r', linestyles='solid', linewidth=2, label=f"COG = {cog:.2f}")
+    ax.vlines(cog, 0, max(y_agg.max(), 1.0), colors='r', linestyles='solid', linewidth=2, label=f"COG = {cog:.2f}")
     ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
     ax.set_ylim(-0.05, 1.05)
     ax.set_xlim(0, 100)
@@ -157,6 +484,15 @@ def plot_agg(ax, agg_pts, cog, activations, speed_mfs):
 
 # --- Main Program Loop ---
 if __name__ == "__main__":
+    # Create the figure once; each iteration clears and redraws the same
+    # axes instead of rebuilding the canvas and event handlers per run.
+    if not BATCH_MODE:
+        plt.ion()
+    run_count = 0
+    fig, axs = plt.subplots(3, 1, figsize=(12, 18))
+    fig.subplots_adjust(hspace=0.5, right=0.75)
+    fig.suptitle("Fuzzy Logic Speed Decision System", fontsize=16, y=0.96)
+
     while True:
         # --- Input Section ---
         while True:
@@ -174,8 +510,8 @@ if __name__ == "__main__":
                 print("Invalid cloud cover input. Try again.")
 
         # --- Fuzzification ---
-        temp_mfs = fuzzify(temp, MFS_DEFINITION["temperature"])
-        cover_mfs = fuzzify(cover, MFS_DEFINITION["cover"])
+        temp_mfs = fuzzify(temp, "temperature")
+        cover_mfs = fuzzify(cover, "cover")
 
         print("\n--- Temperature Fuzzification ---")
         for k, v in temp_mfs.items():
@@ -185,39 +521,46 @@ if __name__ == "__main__":
         for k, v in cover_mfs.items():
             print(f"{k}: {v:.3f}")
 
-        # --- Rule Evaluation ---
-        speed_acts = apply_rules(temp_mfs, cover_mfs)
+        # --- Rule Evaluation (fused with output aggregation) ---
+        speed_acts, agg_y = inference(temp_mfs, cover_mfs)
         print("\n--- Rule-Based Speed Activations ---")
         for k, v in speed_acts.items():
             print(f"{k}: {v:.3f}")
 
         # --- Defuzzification ---
-        speed_cog, agg_curve = defuzzify(speed_acts, MFS_DEFINITION["speed"])
+        speed_cog, agg_curve = defuzzify(agg_y)
         print(f"\nDefuzzified Speed Output (COG): {speed_cog:.3f}")
 
         # --- Defuzz Table Display ---
         print("\n-------------------------------")
         print("|   X   |   Y   |   X * Y     |")
         print("-------------------------------")
-        sum_y, sum_xy = 0.0, 0.0
-        for x in range(0, 101, 5):
-            y = aggregate(x, speed_acts, MFS_DEFINITION["speed"])
-            xy = x * y
-            sum_y += y
-            sum_xy += xy
-            print(f"{x:6} {y:7.3f} {xy:12.3f}")
+        # Every 5th defuzzification sample lands exactly on a table row, so
+        # reuse the curve defuzzify already computed.
+        table_rows = agg_curve[::5]
+        xt, yt = table_rows[:, 0], table_rows[:, 1]
+        xyt = xt * yt
+        sum_y, sum_xy = yt.sum(), xyt.sum()
+        print("\n".join(f"{x:6.0f} {y:7.3f} {xy:12.3f}" for x, y, xy in zip(xt, yt, xyt)))
         print("-------------------------------")
         print(f"Sum Y: {sum_y:.3f}, Sum XY: {sum_xy:.3f}")
         print(f"COG = {sum_xy:.3f} / {sum_y:.3f} = {sum_xy/sum_y:.5f}")
 
         # --- Plotting ---
-        fig, axs = plt.subplots(3, 1, figsize=(12, 18))
-        plt.subplots_adjust(hspace=0.5, right=0.75)
-        plot_mfs(axs[0], "Temperature", MFS_DEFINITION["temperature"], temp, temp_mfs)
-        plot_mfs(axs[1], "Cloud Cover", MFS_DEFINITION["cover"], cover, cover_mfs)
-        plot_agg(axs[2], agg_curve, speed_cog, speed_acts, MFS_DEFINITION["speed"])
-        plt.suptitle("Fuzzy Logic Speed Decision System", fontsize=16, y=0.96)
-        plt.show()
+        for ax in axs:
+            ax.clear()
+
+        plot_mfs(axs[0], "temperature", "Temperature", temp, temp_mfs)
+        plot_mfs(axs[1], "cover", "Cloud Cover", cover, cover_mfs)
+        plot_agg(axs[2], agg_curve, speed_cog, speed_acts)
+
+        run_count += 1
+        if BATCH_MODE:
+            fig.savefig(f"run_{run_count}.png", dpi=100, bbox_inches='tight')
+            print(f"Saved plot to run_{run_count}.png")
+        else:
+            fig.canvas.draw_idle()
+            fig.canvas.flush_events()
 
         # --- Ask User to Run Again ---
         repeat = input("\nWould you like to enter new values? (y/n): ").strip().lower()